@@ -13,6 +13,7 @@ from mock_db import (
 )
 import requests
 from threading import Thread
+from tracing import tracer, traceparent_from_body
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -58,17 +59,23 @@ def issue_token():
 def dispatch_webhook(event, payload):
     """Asynchronously POSTs a webhook to each subscriber of the given event."""
     body = {"event": event, "payload": payload}
+    # threads don't inherit the active span, so hand the parent over explicitly
+    parent = tracer.current_span()
     for sub in WEBHOOK_SUBSCRIBERS:
         if sub["event"] == event:
             url = sub["url"]
             logger.info(f"Hitting webhook for event='{event}' to url='{url}' with payload={payload}")
             def send(u, b):
-                try:
-                    logger.info(f"Successfully sent webhook to {u}")
-                    resp = requests.post(u, json=b, timeout=5)
-                    resp.raise_for_status()
-                except Exception as e:
-                    logger.error(f"Error sending webhook to {u}: {e}")
+                with tracer.span("webhook.dispatch", parent=parent, event=event, url=u) as span:
+                    try:
+                        logger.info(f"Successfully sent webhook to {u}")
+                        # carry the trace in the body too, for consumers that drop headers
+                        b = {**b, "traceparent": tracer.traceparent()}
+                        resp = requests.post(u, json=b, headers=tracer.inject({}), timeout=5)
+                        resp.raise_for_status()
+                    except Exception as e:
+                        logger.error(f"Error sending webhook to {u}: {e}")
+                        span.record_error(e)
             Thread(target=send, args=(url, body), daemon=True).start()
 
 @acme_bp.route("/v1/acme/contacts", methods=["POST"])
@@ -122,18 +129,24 @@ def delete_contact(contact_id):
 WEBHOOK_QUEUE = queue.Queue()
 
 @acme_bp.route("/webhooks/acme", methods=["POST"])
+@traceparent_from_body
 def receive_webhook():    
     event = request.json.get("event")
     payload = request.json.get("payload")
     logger.info(f"Received webhook for event='{event}' with payload={payload}")
-    WEBHOOK_QUEUE.put((event, payload))
+    # the request span already continues the header or, if that was lost, the body's trace
+    WEBHOOK_QUEUE.put((event, payload, tracer.traceparent(), time.time()))
     logger.info(f"Queued webhook for event='{event}' with payload={payload}")
     return '', 200
 
 def process_webhook_queue():
     while True:
-        event, payload = WEBHOOK_QUEUE.get()
-        logger.info(f"Event consumed from queue: event='{event}' with payload={payload}")
+        event, payload, traceparent, enqueued_at = WEBHOOK_QUEUE.get()
+        dequeued_at = time.time()
+        tracer.start_span("webhook.queue_wait", parent=traceparent, start_time=enqueued_at, event=event).end(dequeued_at)
+        with tracer.span("webhook.process", parent=traceparent, event=event,
+                         queue_wait_ms=round((dequeued_at - enqueued_at) * 1000, 3)):
+            logger.info(f"Event consumed from queue: event='{event}' with payload={payload}")
         WEBHOOK_QUEUE.task_done()
 
 # Start the webhook queue processor
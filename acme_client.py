@@ -1,49 +1,100 @@
 import time
 import requests
+from functools import wraps
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
     retry_if_exception_type
 )
+from tracing import tracer
+
+def traced(name):
+    """Wrap one client call (all of its retry attempts) in a span."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name, attempts=0):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def traced_attempt(f):
+    """Give every tenacity attempt its own child span, numbered from 1."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        call = tracer.current_span()
+        attempt = 1
+        if call is not None and "attempts" in call.attributes:
+            attempt = call.attributes["attempts"] = call.attributes["attempts"] + 1
+        with tracer.span("acme.attempt", attempt=attempt) as span:
+            try:
+                return f(*args, **kwargs)
+            except requests.HTTPError as e:
+                if e.response is not None:
+                    span.set_attribute("http.status_code", e.response.status_code)
+                raise
+    return wrapper
+
+# Back-off sleeps go through this hook so they can be skipped without
+# replacing time.sleep for every thread in the process
+_sleep = time.sleep
+
+def traced_sleep(seconds):
+    """Back-off sleep between attempts, recorded so retry waits show up in traces."""
+    with tracer.span("acme.retry_sleep", seconds=seconds):
+        _sleep(seconds)
 
 class AcmeClient:
     # Base delay matching 10 req/min (one slot every 6s)
     BASE_DELAY = 6
 
-    def __init__(self, base_url, client_id, client_secret, timeout=5):
+    def __init__(self, base_url, client_id, client_secret, timeout=5, scheduler=None):
         self.base_url      = base_url
         self.client_id     = client_id
         self.client_secret = client_secret
         self.timeout       = timeout
+        self.scheduler     = scheduler
         self._token        = None
         self._expiry       = 0
 
     def _refresh_token_if_needed(self):
         now = time.time()
         if not self._token or now >= self._expiry:
-            resp = requests.post(
-                f"{self.base_url}/token",
-                json={"client_id": self.client_id, "client_secret": self.client_secret},
-                timeout=self.timeout
-            )
-            resp.raise_for_status()
-            data = resp.json()
+            with tracer.span("acme.token_refresh"):
+                resp = requests.post(
+                    f"{self.base_url}/token",
+                    json={"client_id": self.client_id, "client_secret": self.client_secret},
+                    headers=tracer.inject({}),
+                    timeout=self.timeout
+                )
+                resp.raise_for_status()
+                data = resp.json()
             self._token  = data["access_token"]
             # refresh 60s before true expiry
             self._expiry = now + data.get("expires_in", 3600) - 60
 
     def _headers(self):
         self._refresh_token_if_needed()
-        return {"Authorization": f"Bearer {self._token}"}
+        return tracer.inject({"Authorization": f"Bearer {self._token}"})
+
+    def _acquire_slot(self):
+        # every attempt, retries included, spends one unit of the ACME budget
+        if self.scheduler is not None:
+            with tracer.span("scheduler.wait") as span:
+                span.set_attribute("wait_seconds", self.scheduler.acquire())
 
+    @traced("acme.create_contact")
     @retry(
         retry=retry_if_exception_type(requests.HTTPError),
         wait=wait_exponential(multiplier=BASE_DELAY, min=BASE_DELAY, max=60),
         stop=stop_after_attempt(5),
+        sleep=traced_sleep,
         reraise=True
     )
+    @traced_attempt
     def create_contact(self, payload):
+        self._acquire_slot()
         resp = requests.post(
             f"{self.base_url}/v1/acme/contacts",
             json=payload,
@@ -54,13 +105,17 @@ class AcmeClient:
             resp.raise_for_status()
         return resp.json()
 
+    @traced("acme.get_contact")
     @retry(
         retry=retry_if_exception_type(requests.HTTPError),
         wait=wait_exponential(multiplier=BASE_DELAY, min=BASE_DELAY, max=60),
         stop=stop_after_attempt(5),
+        sleep=traced_sleep,
         reraise=True
     )
+    @traced_attempt
     def get_contact(self, contact_id):
+        self._acquire_slot()
         resp = requests.get(
             f"{self.base_url}/v1/acme/contacts/{contact_id}",
             headers=self._headers(),
@@ -70,13 +125,17 @@ class AcmeClient:
             resp.raise_for_status()
         return resp.json()
 
+    @traced("acme.update_contact")
     @retry(
         retry=retry_if_exception_type(requests.HTTPError),
         wait=wait_exponential(multiplier=BASE_DELAY, min=BASE_DELAY, max=60),
         stop=stop_after_attempt(5),
+        sleep=traced_sleep,
         reraise=True
     )
+    @traced_attempt
     def update_contact(self, contact_id, updates):
+        self._acquire_slot()
         resp = requests.put(
             f"{self.base_url}/v1/acme/contacts/{contact_id}",
             json=updates,
@@ -87,13 +146,17 @@ class AcmeClient:
             resp.raise_for_status()
         return resp.json()
 
+    @traced("acme.delete_contact")
     @retry(
         retry=retry_if_exception_type(requests.HTTPError),
         wait=wait_exponential(multiplier=BASE_DELAY, min=BASE_DELAY, max=60),
         stop=stop_after_attempt(5),
+        sleep=traced_sleep,
         reraise=True
     )
+    @traced_attempt
     def delete_contact(self, contact_id):
+        self._acquire_slot()
         resp = requests.delete(
             f"{self.base_url}/v1/acme/contacts/{contact_id}",
             headers=self._headers(),
@@ -1,15 +1,29 @@
 # app.py
+import os
 from flask import Flask
 from acme import acme_bp, limiter
 from integration import integration_bp
+from profiling import profiler
+from tracing import tracer
 
 app = Flask(__name__)
 app.config['RATELIMIT_HEADERS_ENABLED'] = True
+# Profiling is off unless a token or sample rate is configured
+app.config['PROFILE_TOKEN'] = os.environ.get("PROFILE_TOKEN")
+app.config['PROFILE_SAMPLE_RATE'] = os.environ.get("PROFILE_SAMPLE_RATE", 0)
+app.config['PROFILE_FORMAT'] = os.environ.get("PROFILE_FORMAT", "pstats")
+app.config['PROFILE_SAMPLER_INTERVAL'] = os.environ.get("PROFILE_SAMPLER_INTERVAL", 0)
+# Spans go to this JSON-lines file when set, otherwise to the in-memory exporter
+app.config['TRACE_FILE'] = os.environ.get("TRACE_FILE")
 
+# Init request tracing first so every other hook runs inside the request span
+tracer.init_app(app)
 # Init limiter for mock CRM
 limiter.init_app(app)
 # Register mock-CRM routes
 app.register_blueprint(acme_bp)
+# Init request profiler (admin routes under /admin/profiles when enabled)
+profiler.init_app(app)
 # Register integration routes under /api
 app.register_blueprint(integration_bp, url_prefix="/api")
 
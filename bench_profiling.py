@@ -0,0 +1,65 @@
+"""Benchmark the per-request cost of the profiling hooks.
+
+Run with `python bench_profiling.py`. End-to-end request timings through the
+Flask test client vary by several percent between runs, so the gate times the
+hooks themselves: disabled profiling must install no hooks, and armed but
+untriggered hooks must cost under MAX_OVERHEAD of a trivial request.
+"""
+import sys
+import time
+from flask import Flask, jsonify
+from profiling import RequestProfiler
+
+REQUESTS, ROUNDS, HOOK_CALLS, MAX_OVERHEAD = 1000, 5, 100000, 0.02
+
+def make_app(profile_config=None):
+    app = Flask(__name__)
+
+    @app.route("/ping")
+    def ping():
+        return jsonify(ok=True), 200
+
+    profiler = RequestProfiler()
+    if profile_config is not None:
+        app.config.update(profile_config)
+        profiler.init_app(app)
+    return app, profiler
+
+def request_cost(app):
+    client, best = app.test_client(), float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            client.get("/ping")
+        best = min(best, (time.perf_counter() - start) / REQUESTS)
+    return best
+
+def hook_cost(app, profiler):
+    response = app.response_class()
+    with app.test_request_context("/ping"):
+        start = time.perf_counter()
+        for _ in range(HOOK_CALLS):
+            profiler._start()
+            profiler._finish(response)
+        return (time.perf_counter() - start) / HOOK_CALLS
+
+def main():
+    baseline = request_cost(make_app()[0])
+    print(f"trivial request: {baseline * 1e6:.1f} us")
+
+    disabled, _ = make_app({})
+    hooks = len(disabled.before_request_funcs.get(None, [])) + len(disabled.after_request_funcs.get(None, []))
+    print(f"disabled: {hooks} hooks installed")
+
+    armed, profiler = make_app({"PROFILE_TOKEN": "bench"})
+    cost = hook_cost(armed, profiler)
+    overhead = cost / baseline
+    print(f"armed, not triggered: {cost * 1e9:.0f} ns/request ({overhead:.2%} of a trivial request)")
+
+    sampled, _ = make_app({"PROFILE_SAMPLER_INTERVAL": 0.01})
+    print(f"always-on sampler (10ms): {request_cost(sampled) * 1e6:.1f} us/request (informational)")
+
+    return 0 if hooks == 0 and overhead <= MAX_OVERHEAD else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
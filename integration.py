@@ -1,22 +1,140 @@
 # integration-service/integration.py
+from functools import wraps
 from flask import Blueprint, request, jsonify
 from acme_client import AcmeClient
+from scheduler import RequestScheduler, SchedulerError, INTERACTIVE, PRIORITIES, current_priority
+from jobs import JobQueue, JobQueueFull, IdempotencyConflict, JobError, FAILED
 
 integration_bp = Blueprint('integration', __name__)
 
+# All callers share ACME's 10 req/min budget; the scheduler decides who goes next
+scheduler = RequestScheduler(rate=10, period=60)
+
 # Point at the same server since both run on one port
 acme = AcmeClient(
     base_url="http://127.0.0.1:5000",
     client_id="foo",
-    client_secret="bar"
+    client_secret="bar",
+    scheduler=scheduler
 )
 
+# Async writes (Prefer: respond-async) are drained by this pool instead of the request thread.
+# One lane per scheduler class, plus a worker kept free for interactive writes so they
+# never queue behind bulk jobs that are waiting on the scheduler.
+jobs = JobQueue(workers=4, maxsize=100, lanes=PRIORITIES, reserved=1)
+
+# Longest a synchronous write with an Idempotency-Key waits before answering 202
+SYNC_WAIT_TIMEOUT = 30
+
+# Our field names -> ACME's
+FIELD_MAP = {
+    "firstName": "acme_first_name",
+    "lastName":  "acme_last_name",
+    "email":     "acme_email",
+}
+CONTACT_FIELDS = tuple(FIELD_MAP)
+
+def current_tenant():
+    return (request.headers.get("X-Api-Key")
+            or request.headers.get("X-Tenant-Id")
+            or request.remote_addr
+            or "default")
+
+def prioritized(f):
+    """Run the handler's ACME calls under the caller's priority class and tenant."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        priority = request.headers.get("X-Request-Priority", INTERACTIVE).lower()
+        if priority not in scheduler.classes:
+            return jsonify({"error": f"unknown priority '{priority}'"}), 400
+        with scheduler.context(priority, current_tenant()):
+            return f(*args, **kwargs)
+    return wrapper
+
+def wants_async():
+    return "respond-async" in request.headers.get("Prefer", "")
+
+def wants_job():
+    """Async writes, and any write carrying an Idempotency-Key, go through the job queue."""
+    return wants_async() or "Idempotency-Key" in request.headers
+
+def validate_contact(body, require_all=False):
+    """Return an error message for an invalid contact payload, or None."""
+    if not isinstance(body, dict) or not body:
+        return "request body must be a non-empty JSON object"
+    unknown = set(body) - set(CONTACT_FIELDS)
+    if unknown:
+        return f"unknown fields: {', '.join(sorted(unknown))}"
+    if require_all:
+        missing = [f for f in CONTACT_FIELDS if f not in body]
+        if missing:
+            return f"missing fields: {', '.join(missing)}"
+    for field, value in body.items():
+        if not isinstance(value, str) or not value.strip():
+            return f"'{field}' must be a non-empty string"
+    if "email" in body and "@" not in body["email"]:
+        return "'email' must be a valid email address"
+    return None
+
+def enqueue(operation, fn, *args, success_code=200):
+    """Queue a write for the worker pool, deduplicated by Idempotency-Key.
+
+    Async requests are acknowledged with 202 and a job id. Synchronous ones
+    wait (up to SYNC_WAIT_TIMEOUT) for the job and answer as the direct call
+    would have, so a replayed key returns the original result instead of
+    writing twice.
+    """
+    key = request.headers.get("Idempotency-Key")
+    if key is not None:
+        key = f"{current_tenant()}:{key}"
+    try:
+        job, created = jobs.submit(operation, fn, *args, idempotency_key=key,
+                                   success_code=success_code, lane=current_priority())
+    except IdempotencyConflict as e:
+        return jsonify({"error": str(e)}), 409
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+    headers = {} if created else {"Idempotent-Replayed": "true"}
+    # a synchronous write that outlives SYNC_WAIT_TIMEOUT is handed back as a job to poll
+    if wants_async() or not job.done.wait(SYNC_WAIT_TIMEOUT):
+        headers["Location"] = f"/api/jobs/{job.id}"
+        return jsonify(job.to_dict()), 202, headers
+    if job.status == FAILED:
+        return jsonify({"error": job.error}), job.status_code, headers
+    if job.result is None:
+        return '', job.status_code, headers
+    return jsonify(job.result), job.status_code, headers
+
+def acme_job(f):
+    """Surface scheduler rejections from a background write as 503 on the job."""
+    @wraps(f)
+    def wrapper(*args):
+        try:
+            return f(*args)
+        except SchedulerError as e:
+            raise JobError(str(e), 503)
+    return wrapper
+
+@acme_job
+def run_create(acme_body):
+    return map_from_acme(acme.create_contact(acme_body))
+
+@acme_job
+def run_update(contact_id, acme_updates):
+    return map_from_acme(acme.update_contact(contact_id, acme_updates))
+
+@acme_job
+def run_delete(contact_id):
+    if not acme.delete_contact(contact_id):
+        raise JobError("not found", 404)
+    return None
+
 def map_to_acme(body):
-    return {
-        "acme_first_name": body.get("firstName"),
-        "acme_last_name":  body.get("lastName"),
-        "acme_email":      body.get("email")
-    }
+    return {acme_field: body.get(field) for field, acme_field in FIELD_MAP.items()}
+
+def map_updates_to_acme(updates):
+    # partial updates only carry the fields being changed
+    return {FIELD_MAP.get(k, f"acme_{k}"): v for k, v in updates.items()}
 
 def map_from_acme(data):
     return {
@@ -27,36 +145,74 @@ def map_from_acme(data):
     }
 
 @integration_bp.route("/contacts", methods=["POST"])
+@prioritized
 def create_contact():
     body = request.get_json() or {}
+    if wants_job():
+        error = validate_contact(body, require_all=True)
+        if error:
+            return jsonify({"error": error}), 400
+        return enqueue("create_contact", run_create, map_to_acme(body), success_code=201)
     try:
         crm = acme.create_contact(map_to_acme(body))
+    except SchedulerError as e:
+        return jsonify({"error": str(e), "priority": e.priority}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 502
     return jsonify(map_from_acme(crm)), 201
 
 @integration_bp.route("/contacts/<contact_id>", methods=["GET"])
+@prioritized
 def get_contact(contact_id):
     try:
         crm = acme.get_contact(contact_id)
+    except SchedulerError as e:
+        return jsonify({"error": str(e), "priority": e.priority}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 502
     return jsonify(map_from_acme(crm)), 200
 
 @integration_bp.route("/contacts/<contact_id>", methods=["PUT"])
+@prioritized
 def update_contact(contact_id):
     updates = request.get_json() or {}
-    acme_updates = {f"acme_{k}": v for k, v in updates.items()}
+    acme_updates = map_updates_to_acme(updates)
+    if wants_job():
+        error = validate_contact(updates)
+        if error:
+            return jsonify({"error": error}), 400
+        return enqueue("update_contact", run_update, contact_id, acme_updates)
     try:
         crm = acme.update_contact(contact_id, acme_updates)
+    except SchedulerError as e:
+        return jsonify({"error": str(e), "priority": e.priority}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 502
     return jsonify(map_from_acme(crm)), 200
 
 @integration_bp.route("/contacts/<contact_id>", methods=["DELETE"])
+@prioritized
 def delete_contact(contact_id):
+    if wants_job():
+        return enqueue("delete_contact", run_delete, contact_id, success_code=204)
     try:
         success = acme.delete_contact(contact_id)
+    except SchedulerError as e:
+        return jsonify({"error": str(e), "priority": e.priority}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 502
-    return ('', 204) if success else (jsonify({"error": "not found"}), 404)
\ No newline at end of file
+    return ('', 204) if success else (jsonify({"error": "not found"}), 404)
+
+@integration_bp.route("/scheduler/stats", methods=["GET"])
+def scheduler_stats():
+    """Per-class queue depth, rejections and wait-time histograms."""
+    return jsonify(scheduler.stats()), 200
+
+
+@integration_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Status and result of an asynchronous write."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job.to_dict()), 200
@@ -0,0 +1,163 @@
+import logging
+import threading
+from threading import Thread
+import time
+import uuid
+import contextvars
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class JobQueueFull(Exception):
+    """The bounded work queue has no room for another job."""
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused for a different request."""
+
+
+class JobError(Exception):
+    """Raised by a job to fail with a specific HTTP status."""
+
+    def __init__(self, message, status_code=502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Job:
+    def __init__(self, operation, fingerprint, success_code, lane, idempotency_key=None):
+        self.id           = str(uuid.uuid4())
+        self.operation    = operation
+        self.fingerprint  = fingerprint
+        self.success_code = success_code
+        self.lane         = lane
+        self.idempotency_key = idempotency_key
+        self.status       = QUEUED
+        self.result       = None
+        self.error        = None
+        self.status_code  = None
+        self.created_at   = time.time()
+        self.started_at   = None
+        self.finished_at  = None
+        self.done         = threading.Event()
+
+    def to_dict(self):
+        return {
+            "id":          self.id,
+            "operation":   self.operation,
+            "lane":        self.lane,
+            "status":      self.status,
+            "result":      self.result,
+            "error":       self.error,
+            "statusCode":  self.status_code,
+            "createdAt":   self.created_at,
+            "startedAt":   self.started_at,
+            "finishedAt":  self.finished_at,
+        }
+
+
+class JobQueue:
+    """Bounded in-process work queue drained by a pool of daemon worker threads.
+
+    Jobs wait in one FIFO lane per priority, highest first. Workers always take
+    from the highest non-empty lane. The first `reserved` workers only take
+    from the top lane, so jobs there are never stuck behind long waits lower
+    down. Jobs run in a copy of the submitter's context, so contextvars such
+    as the scheduler's priority class follow the work onto the worker thread.
+    """
+
+    def __init__(self, workers=4, maxsize=100, max_jobs=1000, lanes=("default",), reserved=0):
+        if reserved >= workers and len(lanes) > 1:
+            raise ValueError("reserved workers would leave lower lanes with no worker")
+        self.lanes     = tuple(lanes)
+        self.maxsize   = maxsize
+        self._pending  = {lane: deque() for lane in self.lanes}
+        self._jobs     = OrderedDict()
+        self._keys     = {}
+        self._lock     = threading.Lock()
+        self._ready    = threading.Condition(self._lock)
+        self.max_jobs  = max_jobs
+        for i in range(workers):
+            lanes_served = self.lanes[:1] if i < reserved else self.lanes
+            Thread(target=self._work, args=(lanes_served,), name=f"job-worker-{i}", daemon=True).start()
+
+    def submit(self, operation, fn, *args, idempotency_key=None, success_code=200, lane=None):
+        """Enqueue fn(*args); returns (job, created) where created is False for a replay."""
+        lane = lane or self.lanes[0]
+        if lane not in self._pending:
+            raise ValueError(f"Unknown lane '{lane}'")
+        fingerprint = (operation, args)
+        with self._lock:
+            if idempotency_key is not None and idempotency_key in self._keys:
+                job = self._jobs.get(self._keys[idempotency_key])
+                if job is not None:
+                    if job.fingerprint != fingerprint:
+                        raise IdempotencyConflict(
+                            f"Idempotency-Key '{idempotency_key}' was already used for a different request"
+                        )
+                    return job, False
+            if sum(len(q) for q in self._pending.values()) >= self.maxsize:
+                raise JobQueueFull(f"Work queue is full ({self.maxsize} jobs pending)")
+            job = Job(operation, fingerprint, success_code, lane, idempotency_key)
+            self._pending[lane].append((job, contextvars.copy_context(), fn, args))
+            self._ready.notify_all()
+            self._jobs[job.id] = job
+            if idempotency_key is not None:
+                self._keys[idempotency_key] = job.id
+            self._evict()
+        logger.info(f"Queued job {job.id} for operation='{operation}'")
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _evict(self):
+        # drop the oldest finished jobs (and their idempotency keys) past max_jobs
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].done.is_set():
+                del self._jobs[job_id]
+                excess -= 1
+        live = set(self._jobs)
+        self._keys = {k: v for k, v in self._keys.items() if v in live}
+
+    def _next(self, lanes_served):
+        with self._ready:
+            while True:
+                for lane in lanes_served:
+                    if self._pending[lane]:
+                        return self._pending[lane].popleft()
+                self._ready.wait()
+
+    def _release_key(self, job):
+        # a 5xx is worth retrying, so let the same Idempotency-Key run again
+        with self._lock:
+            if self._keys.get(job.idempotency_key) == job.id:
+                del self._keys[job.idempotency_key]
+
+    def _work(self, lanes_served):
+        while True:
+            job, ctx, fn, args = self._next(lanes_served)
+            job.status, job.started_at = RUNNING, time.time()
+            try:
+                job.result = ctx.run(fn, *args)
+                job.status, job.status_code = SUCCEEDED, job.success_code
+            except JobError as e:
+                job.error, job.status_code, job.status = str(e), e.status_code, FAILED
+            except Exception as e:
+                job.error, job.status_code, job.status = str(e), 502, FAILED
+                logger.error(f"Job {job.id} failed: {e}")
+            finally:
+                job.finished_at = time.time()
+                if job.status == FAILED and job.status_code >= 500 and job.idempotency_key is not None:
+                    self._release_key(job)
+                job.done.set()
+            logger.info(f"Job {job.id} finished with status='{job.status}'")
@@ -0,0 +1,263 @@
+import cProfile
+import hmac
+import logging
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from threading import Thread
+
+logger = logging.getLogger(__name__)
+
+PSTATS, COLLAPSED = "pstats", "collapsed"
+FORMATS = (PSTATS, COLLAPSED)
+PROFILE_KEY = "profiling.active"
+
+profiling_bp = Blueprint('profiling', __name__)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _collapse(frame):
+    """Render a frame's stack root-first in collapsed ("a;b;c") form."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Periodically samples thread stacks into collapsed-stack counts.
+
+    With thread_id set only that thread is sampled (per-request profiles);
+    otherwise every thread except the sampler itself is (always-on mode).
+    """
+
+    def __init__(self, interval=0.01, thread_id=None, max_stacks=5000):
+        self.interval   = interval
+        self.thread_id  = thread_id
+        self.max_stacks = max_stacks
+        self.stacks     = Counter()
+        self.samples    = 0
+        self._lock      = threading.Lock()
+        self._stop      = threading.Event()
+        self._thread    = None
+
+    def start(self):
+        self._thread = Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frames = {self.thread_id: frames[self.thread_id]} if self.thread_id in frames else {}
+            with self._lock:
+                for tid, frame in frames.items():
+                    if tid == own:
+                        continue
+                    stack = _collapse(frame)
+                    # cap distinct stacks so a long-running sampler has bounded memory
+                    if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                        stack = "[other]"
+                    self.stacks[stack] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        with self._lock:
+            return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def hot_frames(self, top=20):
+        """Leaf frames (where samples landed) ranked by sample count."""
+        leaves = Counter()
+        with self._lock:
+            for stack, n in self.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += n
+            total = self.samples
+        return {"samples": total, "frames": [{"frame": f, "count": n} for f, n in leaves.most_common(top)]}
+
+
+class RequestProfiler:
+    """Opt-in request profiling for a Flask app.
+
+    A request is profiled when it carries a valid X-Profile-Token header or is
+    picked by PROFILE_SAMPLE_RATE. When neither is configured init_app installs
+    no hooks at all, so the disabled cost is zero.
+    """
+
+    def __init__(self, max_profiles=20):
+        self.profiles    = deque(maxlen=max_profiles)
+        self.token       = None
+        self.sample_rate = 0.0
+        self.format      = PSTATS
+        self.sampler     = None
+        # cProfile cannot run in two threads at once on newer Pythons
+        self._cprofile_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.token       = app.config.get("PROFILE_TOKEN") or None
+        self.sample_rate = float(app.config.get("PROFILE_SAMPLE_RATE") or 0)
+        self.format      = app.config.get("PROFILE_FORMAT", PSTATS)
+        interval         = float(app.config.get("PROFILE_SAMPLER_INTERVAL") or 0)
+
+        if interval > 0:
+            self.sampler = StackSampler(interval=interval).start()
+            logger.info(f"Always-on stack sampler started (interval={interval}s)")
+        if self.token or self.sample_rate > 0:
+            app.before_request(self._start)
+            app.after_request(self._finish)
+            app.teardown_request(self._teardown)
+        if self.token:
+            app.register_blueprint(profiling_bp, url_prefix="/admin/profiles")
+        elif self.sample_rate > 0 or self.sampler is not None:
+            logger.warning(
+                "PROFILE_SAMPLE_RATE / PROFILE_SAMPLER_INTERVAL are set without PROFILE_TOKEN: "
+                "profiles will be captured but /admin/profiles is disabled, so they cannot be downloaded"
+            )
+        app.extensions["profiler"] = self
+
+    def authorized(self):
+        supplied = request.headers.get("X-Profile-Token", "")
+        return bool(self.token) and hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def _requested_format(self):
+        supplied = request.environ.get("HTTP_X_PROFILE_TOKEN")
+        if supplied:
+            if request.blueprint == profiling_bp.name or not self.authorized():
+                return None
+            fmt = request.headers.get("X-Profile-Format", self.format)
+            return fmt if fmt in FORMATS else self.format
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.format
+        return None
+
+    def _start(self):
+        fmt = self._requested_format()
+        if fmt is None:
+            return
+        if fmt == PSTATS:
+            if not self._cprofile_lock.acquire(blocking=False):
+                logger.info("Skipping pstats profile: another request is being profiled")
+                return
+            collector = cProfile.Profile()
+            try:
+                collector.enable()
+            except Exception as e:
+                # another profiler (e.g. sys.setprofile or a debugger) may already own the hook
+                self._cprofile_lock.release()
+                logger.warning(f"Skipping pstats profile: could not enable cProfile: {e}")
+                return
+        else:
+            collector = StackSampler(interval=0.001, thread_id=threading.get_ident()).start()
+        request.environ[PROFILE_KEY] = (fmt, collector, time.perf_counter())
+
+    def _stop(self, environ):
+        fmt, collector, started = environ.pop(PROFILE_KEY)
+        duration = time.perf_counter() - started
+        if fmt == PSTATS:
+            collector.disable()
+            self._cprofile_lock.release()
+            collector.create_stats()
+            data = marshal.dumps(collector.stats)
+        else:
+            collector.stop()
+            data = collector.collapsed().encode()
+        profile = {
+            "id":         str(uuid.uuid4()),
+            "format":     fmt,
+            "method":     request.method,
+            "path":       request.path,
+            "durationMs": round(duration * 1000, 3),
+            "createdAt":  time.time(),
+            "bytes":      len(data),
+        }
+        self.profiles.append((profile, data))
+        logger.info(f"Captured {fmt} profile {profile['id']} for {request.method} {request.path}")
+        return profile
+
+    def _finish(self, response):
+        # hooks run on every request once armed, so stick to a plain dict lookup
+        environ = request.environ
+        if PROFILE_KEY in environ:
+            response.headers["X-Profile-Id"] = self._stop(environ)["id"]
+        return response
+
+    def _teardown(self, exc):
+        # after_request is skipped if the request dies early; never leak a running profiler
+        environ = request.environ
+        if PROFILE_KEY in environ:
+            self._stop(environ)
+
+    def find(self, profile_id):
+        for profile, data in reversed(self.profiles):
+            if profile_id in (profile["id"], "latest"):
+                return profile, data
+        return None, None
+
+
+profiler = RequestProfiler()
+
+
+def current_profiler():
+    return current_app.extensions["profiler"]
+
+
+@profiling_bp.before_request
+def require_token():
+    if not current_profiler().authorized():
+        abort(401, "Missing or invalid X-Profile-Token header")
+
+
+@profiling_bp.route("", methods=["GET"])
+def list_profiles():
+    """Metadata for the most recent request profiles, newest first."""
+    return jsonify([profile for profile, _ in reversed(current_profiler().profiles)]), 200
+
+
+@profiling_bp.route("/sampler", methods=["GET"])
+def sampler_stacks():
+    """Always-on sampler output as collapsed stacks (flamegraph.pl input)."""
+    sampler = current_profiler().sampler
+    if sampler is None:
+        abort(404, "Stack sampler is not enabled")
+    return Response(sampler.collapsed(), mimetype="text/plain"), 200
+
+
+@profiling_bp.route("/sampler/hot", methods=["GET"])
+def sampler_hot_frames():
+    """Hottest leaf frames seen by the always-on sampler."""
+    sampler = current_profiler().sampler
+    if sampler is None:
+        abort(404, "Stack sampler is not enabled")
+    top = request.args.get("top", 20, type=int)
+    return jsonify(sampler.hot_frames(top)), 200
+
+
+@profiling_bp.route("/<profile_id>", methods=["GET"])
+def download_profile(profile_id):
+    """Download one profile ("latest" for the newest) as .pstats or collapsed text."""
+    profile, data = current_profiler().find(profile_id)
+    if profile is None:
+        abort(404, "Profile not found")
+    if profile["format"] == PSTATS:
+        mimetype, ext = "application/octet-stream", "pstats"
+    else:
+        mimetype, ext = "text/plain", "collapsed"
+    headers = {"Content-Disposition": f"attachment; filename={profile['id']}.{ext}"}
+    return Response(data, mimetype=mimetype, headers=headers), 200
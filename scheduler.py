@@ -0,0 +1,274 @@
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Priority classes, highest first. Weights set each class's share of the
+# upstream budget when several classes are backlogged at once.
+INTERACTIVE, BACKGROUND, BULK = "interactive", "background", "bulk"
+PRIORITIES = (INTERACTIVE, BACKGROUND, BULK)
+
+DEFAULT_CLASSES = {
+    INTERACTIVE: {"weight": 8, "max_queue": 50,  "deadline": 15},
+    BACKGROUND:  {"weight": 3, "max_queue": 200, "deadline": 300},
+    BULK:        {"weight": 1, "max_queue": 500, "deadline": 1800},
+}
+
+# Wait-time histogram bucket upper bounds, in seconds, up to the longest class deadline
+WAIT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, float("inf"))
+
+# (priority, tenant) for the code currently calling into AcmeClient
+_current = contextvars.ContextVar("acme_schedule", default=None)
+
+
+def current_priority():
+    """Priority class of the code currently running (interactive outside any context)."""
+    ctx = _current.get()
+    return ctx[0] if ctx else INTERACTIVE
+
+
+class SchedulerError(Exception):
+    """Base class for requests the scheduler refused to dispatch."""
+
+    def __init__(self, message, priority):
+        super().__init__(message)
+        self.priority = priority
+
+
+class QueueFull(SchedulerError):
+    """The priority class already has max_queue requests waiting."""
+
+
+class DeadlineExceeded(SchedulerError):
+    """No upstream slot became free before the request's deadline."""
+
+
+def _bound_label(bound):
+    # JSON has no infinity, so the overflow bucket is reported as "+Inf"
+    return "+Inf" if bound == float("inf") else bound
+
+
+class WaitHistogram:
+    """Cumulative-bucket histogram of queue wait times."""
+
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.buckets = buckets
+        self.counts  = [0] * len(buckets)
+        self.count   = 0
+        self.total   = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (None if empty)."""
+        if not self.count:
+            return None
+        rank, seen = q / 100 * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def _percentile_label(self, q):
+        bound = self.percentile(q)
+        return None if bound is None else _bound_label(bound)
+
+    def snapshot(self):
+        cumulative, buckets = 0, {}
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            buckets[str(_bound_label(bound))] = cumulative
+        return {
+            "count":   self.count,
+            "sum":     round(self.total, 6),
+            "p50":     self._percentile_label(50),
+            "p99":     self._percentile_label(99),
+            "buckets": buckets,
+        }
+
+
+class _FairQueue:
+    """Start-time fair queue: one FIFO per key, served in proportion to weight.
+
+    A key that goes idle re-enters at the current virtual time, so it cannot
+    bank credit while idle and cannot be starved by long-running keys. Keys
+    come from client headers, so idle keys are forgotten as soon as their tag
+    carries no state.
+    """
+
+    def __init__(self, rank=None):
+        self._queues = {}
+        self._start  = {}
+        self._vtime  = 0.0
+        # tie-break order for keys with equal start tags (lower goes first)
+        self._rank   = rank or {}
+
+    def __len__(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def push(self, key, item):
+        q = self._queues.setdefault(key, deque())
+        if not q:
+            self._start[key] = max(self._start.get(key, 0.0), self._vtime)
+        q.append(item)
+
+    def pop(self, weight_of):
+        backlogged = [k for k, q in self._queues.items() if q]
+        if not backlogged:
+            return None
+        key = min(backlogged, key=lambda k: (self._start[k], self._rank.get(k, 0)))
+        item = self._queues[key].popleft()
+        self._vtime = self._start[key]
+        self._start[key] += 1.0 / weight_of(key)
+        if not self._queues[key]:
+            del self._queues[key]
+        self._forget_idle()
+        return item
+
+    def remove(self, key, item):
+        q = self._queues.get(key)
+        if q and item in q:
+            q.remove(item)
+            if not q:
+                del self._queues[key]
+                self._forget_idle()
+
+    def _forget_idle(self):
+        # an idle key at or below vtime would re-enter at vtime anyway, and once
+        # nothing is backlogged vtime can jump past every tag
+        if not self._queues:
+            self._vtime = max(self._start.values(), default=self._vtime)
+            self._start.clear()
+            return
+        for key in [k for k, tag in self._start.items() if k not in self._queues and tag <= self._vtime]:
+            del self._start[key]
+
+
+class _Waiter:
+    __slots__ = ("priority", "tenant", "enqueued", "deadline", "granted")
+
+    def __init__(self, priority, tenant, enqueued, deadline):
+        self.priority = priority
+        self.tenant   = tenant
+        self.enqueued = enqueued
+        self.deadline = deadline
+        self.granted  = False
+
+
+class RequestScheduler:
+    """Admits calls to the shared ACME budget by priority class and tenant.
+
+    A sliding window models the upstream quota: at most `rate` calls are
+    granted in any `period` seconds, matching flask-limiter's moving window on
+    the ACME routes. Waiting calls are ordered by weighted-fair queuing across
+    priority classes and, within a class, across tenants.
+    """
+
+    def __init__(self, rate=10, period=60, classes=None, tenant_weights=None, clock=time.monotonic):
+        self.rate      = rate
+        self.period    = period
+        self.classes   = {**DEFAULT_CLASSES, **(classes or {})}
+        self.tenant_weights = tenant_weights or {}
+        self._clock    = clock
+        self._granted  = deque()
+        self._cond     = threading.Condition()
+        self._classes  = _FairQueue(rank={p: i for i, p in enumerate(PRIORITIES)})
+        self._tenants  = {p: _FairQueue() for p in self.classes}
+        self._pending  = {p: 0 for p in self.classes}
+        self._waits    = {p: WaitHistogram() for p in self.classes}
+        self._rejected = {p: {"queue_full": 0, "deadline": 0} for p in self.classes}
+
+    @contextmanager
+    def context(self, priority=INTERACTIVE, tenant="default"):
+        """Tag AcmeClient calls made inside the block with a priority and tenant."""
+        if priority not in self.classes:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        token = _current.set((priority, tenant))
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    def acquire(self, priority=None, tenant=None):
+        """Block until an upstream slot is granted; returns seconds spent waiting."""
+        ctx_priority, ctx_tenant = _current.get() or (INTERACTIVE, "default")
+        priority = priority or ctx_priority
+        tenant   = tenant or ctx_tenant
+        conf     = self.classes[priority]
+
+        with self._cond:
+            now = self._clock()
+            if self._pending[priority] >= conf["max_queue"]:
+                self._rejected[priority]["queue_full"] += 1
+                raise QueueFull(f"{priority} queue is full ({conf['max_queue']} waiting)", priority)
+
+            waiter = _Waiter(priority, tenant, now, now + conf["deadline"])
+            self._pending[priority] += 1
+            if not self._tenants[priority]:
+                self._classes.push(priority, priority)
+            self._tenants[priority].push(tenant, waiter)
+
+            while True:
+                self._dispatch(now)
+                if waiter.granted:
+                    waited = now - waiter.enqueued
+                    self._waits[priority].observe(waited)
+                    return waited
+                if now >= waiter.deadline:
+                    self._expire(waiter)
+                    raise DeadlineExceeded(
+                        f"{priority} request waited {conf['deadline']}s without an upstream slot", priority
+                    )
+                self._cond.wait(timeout=min(self._until_next_slot(now), waiter.deadline - now))
+                now = self._clock()
+
+    def _expire_window(self, now):
+        while self._granted and self._granted[0] <= now - self.period:
+            self._granted.popleft()
+
+    def _until_next_slot(self, now):
+        # the oldest grant in the window is the next to fall out of it
+        return max(self._granted[0] + self.period - now, 0.001)
+
+    def _dispatch(self, now):
+        """Hand out every free slot in the window to the next waiters in fair order."""
+        self._expire_window(now)
+        granted = False
+        while len(self._granted) < self.rate and self._classes:
+            priority = self._classes.pop(lambda p: self.classes[p]["weight"])
+            waiter = self._tenants[priority].pop(lambda t: self.tenant_weights.get(t, 1))
+            if self._tenants[priority]:
+                self._classes.push(priority, priority)
+            waiter.granted = True
+            self._pending[priority] -= 1
+            self._granted.append(now)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _expire(self, waiter):
+        tenants = self._tenants[waiter.priority]
+        tenants.remove(waiter.tenant, waiter)
+        if not tenants:
+            self._classes.remove(waiter.priority, waiter.priority)
+        self._pending[waiter.priority] -= 1
+        self._rejected[waiter.priority]["deadline"] += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                p: {
+                    "queued":   self._pending[p],
+                    "rejected": dict(self._rejected[p]),
+                    "wait_seconds": self._waits[p].snapshot(),
+                }
+                for p in self.classes
+            }
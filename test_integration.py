@@ -1,5 +1,10 @@
 # test_integration.py
+import re
+import threading
+import time
 import pytest
+import requests_mock as requests_mock_lib
+from acme_client import AcmeClient
 from mock_db import (
     create_contact as db_create,
     get_contact as db_get,
@@ -351,3 +356,118 @@ def test_update_flow(client):
     assert updated_contact["email"] == "updated.person@example.com", f"Expected email 'updated.person@example.com', got '{updated_contact.get('email')}'"
     
     print("========== UPDATE FLOW TEST COMPLETED SUCCESSFULLY ==========")
+
+def wait_for_job(client, job_id, attempts=100):
+    for _ in range(attempts):
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_async_create_returns_202_and_job(client):
+    """Async create is acknowledged immediately and completes in the background"""
+    resp = client.post(
+        "/api/contacts",
+        json={"firstName": "Async", "lastName": "Create", "email": "async.create@example.com"},
+        headers={"Prefer": "respond-async"},
+    )
+    assert resp.status_code == 202
+    job_id = resp.get_json()["id"]
+    assert resp.headers["Location"] == f"/api/jobs/{job_id}"
+
+    job = wait_for_job(client, job_id)
+    assert job["status"] == "succeeded"
+    assert job["statusCode"] == 201
+    assert db_get(job["result"]["id"])["acme_email"] == "async.create@example.com"
+
+def test_async_create_validates_before_queueing(client):
+    resp = client.post(
+        "/api/contacts",
+        json={"firstName": "NoEmail", "lastName": "Test"},
+        headers={"Prefer": "respond-async"},
+    )
+    assert resp.status_code == 400
+    assert "email" in resp.get_json()["error"]
+
+def test_async_idempotency_key_deduplicates(client):
+    headers = {"Prefer": "respond-async", "Idempotency-Key": "dedupe-1"}
+    body = {"firstName": "Once", "lastName": "Only", "email": "once.only@example.com"}
+    first = client.post("/api/contacts", json=body, headers=headers)
+    second = client.post("/api/contacts", json=body, headers=headers)
+    assert first.status_code == second.status_code == 202
+    assert first.get_json()["id"] == second.get_json()["id"]
+
+    conflict = client.post("/api/contacts", json={**body, "email": "other@example.com"}, headers=headers)
+    assert conflict.status_code == 409
+
+def test_async_delete_missing_contact_fails_job(client):
+    resp = client.delete("/api/contacts/does-not-exist", headers={"Prefer": "respond-async"})
+    assert resp.status_code == 202
+    job = wait_for_job(client, resp.get_json()["id"])
+    assert job["status"] == "failed"
+    assert job["statusCode"] == 404
+
+def test_unknown_job_returns_404(client):
+    assert client.get("/api/jobs/nope").status_code == 404
+
+@pytest.fixture
+def real_acme(monkeypatch, requests_mock):
+    """A real AcmeClient talking to the mock-CRM routes through the Flask test client"""
+    crm = flask_app.test_client()
+
+    def forward(request, context):
+        resp = crm.open(request.path_url, method=request.method,
+                        headers=dict(request.headers), data=request.body)
+        context.status_code = resp.status_code
+        return resp.get_data()
+
+    requests_mock.register_uri(requests_mock_lib.ANY, re.compile(r"^http://acme\.test/"), content=forward)
+    monkeypatch.setattr(integration, "acme", AcmeClient(base_url="http://acme.test", client_id="foo", client_secret="bar"))
+
+def test_async_update_changes_acme_fields(client, real_acme):
+    rec = db_create({"acme_first_name": "A", "acme_last_name": "B", "acme_email": "a@b.c"})
+    resp = client.put(f"/api/contacts/{rec['id']}", json={"firstName": "Changed"},
+                      headers={"Prefer": "respond-async"})
+    assert resp.status_code == 202
+    job = wait_for_job(client, resp.get_json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["result"]["firstName"] == "Changed"
+    assert db_get(rec["id"])["acme_first_name"] == "Changed"
+    assert "acme_firstName" not in db_get(rec["id"])
+
+def test_sync_update_changes_acme_fields(client, real_acme):
+    rec = db_create({"acme_first_name": "A", "acme_last_name": "B", "acme_email": "a@b.c"})
+    resp = client.put(f"/api/contacts/{rec['id']}", json={"lastName": "Renamed"})
+    assert resp.status_code == 200
+    assert resp.get_json()["lastName"] == "Renamed"
+    assert db_get(rec["id"])["acme_last_name"] == "Renamed"
+
+def test_sync_idempotency_key_deduplicates(client):
+    headers = {"Idempotency-Key": "sync-dedupe-1"}
+    body = {"firstName": "Sync", "lastName": "Once", "email": "sync.once@example.com"}
+    before = len(STORE)
+    first = client.post("/api/contacts", json=body, headers=headers)
+    second = client.post("/api/contacts", json=body, headers=headers)
+    assert first.status_code == second.status_code == 201
+    assert first.get_json()["id"] == second.get_json()["id"]
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert len(STORE) == before + 1
+
+def test_sync_write_past_timeout_returns_202(client, monkeypatch):
+    release = threading.Event()
+    slow = integration.acme
+    class SlowAcme:
+        def create_contact(self, payload):
+            release.wait(2)
+            return slow.create_contact(payload)
+    monkeypatch.setattr(integration, "acme", SlowAcme())
+    monkeypatch.setattr(integration, "SYNC_WAIT_TIMEOUT", 0.05)
+    resp = client.post("/api/contacts",
+                       json={"firstName": "Slow", "lastName": "Write", "email": "slow.write@example.com"},
+                       headers={"Idempotency-Key": "sync-slow-1"})
+    assert resp.status_code == 202
+    job_id = resp.get_json()["id"]
+    assert resp.headers["Location"] == f"/api/jobs/{job_id}"
+    release.set()
+    assert wait_for_job(client, job_id)["statusCode"] == 201
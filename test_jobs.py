@@ -0,0 +1,125 @@
+import contextvars
+import threading
+import pytest
+from jobs import (
+    JobQueue,
+    JobQueueFull,
+    IdempotencyConflict,
+    JobError,
+    SUCCEEDED,
+    FAILED,
+)
+
+def test_job_runs_and_records_result():
+    q = JobQueue(workers=1, maxsize=10)
+    job, created = q.submit("add", lambda a, b: a + b, 1, 2, success_code=201)
+    assert created
+    assert job.done.wait(2)
+    assert job.status == SUCCEEDED
+    assert job.result == 3
+    assert job.status_code == 201
+    assert q.get(job.id) is job
+
+def test_job_error_sets_status_code():
+    def fail():
+        raise JobError("not found", 404)
+    q = JobQueue(workers=1, maxsize=10)
+    job, _ = q.submit("fail", fail)
+    assert job.done.wait(2)
+    assert job.status == FAILED
+    assert job.status_code == 404
+    assert job.error == "not found"
+
+def test_idempotency_key_replays_and_conflicts():
+    q = JobQueue(workers=1, maxsize=10)
+    first, created = q.submit("op", lambda x: x, {"a": 1}, idempotency_key="k1")
+    again, replayed = q.submit("op", lambda x: x, {"a": 1}, idempotency_key="k1")
+    assert created and not replayed
+    assert again is first
+    with pytest.raises(IdempotencyConflict):
+        q.submit("op", lambda x: x, {"a": 2}, idempotency_key="k1")
+
+def test_bounded_queue_rejects_when_full():
+    started, release = threading.Event(), threading.Event()
+    def block():
+        started.set()
+        release.wait(2)
+    q = JobQueue(workers=1, maxsize=1)
+    q.submit("block", block)
+    assert started.wait(2)
+    # the worker is busy, so one job fits in the queue and the next is rejected
+    q.submit("queued", lambda: None)
+    with pytest.raises(JobQueueFull):
+        q.submit("overflow", lambda: None)
+    release.set()
+
+def test_job_runs_in_submitter_context():
+    var = contextvars.ContextVar("var", default="unset")
+    q = JobQueue(workers=1, maxsize=10)
+    token = var.set("from-request")
+    job, _ = q.submit("ctx", var.get)
+    var.reset(token)
+    assert job.done.wait(2)
+    assert job.result == "from-request"
+
+def test_finished_jobs_are_evicted():
+    q = JobQueue(workers=1, maxsize=10, max_jobs=2)
+    first, _ = q.submit("op", lambda: 1, idempotency_key="old")
+    first.done.wait(2)
+    for i in range(2):
+        job, _ = q.submit("op", lambda: 1)
+        job.done.wait(2)
+    assert q.get(first.id) is None
+    replay, created = q.submit("op", lambda: 1, idempotency_key="old")
+    assert created and replay is not first
+
+def test_higher_lane_is_drained_first():
+    started, release = threading.Event(), threading.Event()
+    def block():
+        started.set()
+        release.wait(2)
+    q = JobQueue(workers=1, maxsize=10, lanes=("interactive", "bulk"))
+    q.submit("block", block, lane="bulk")
+    assert started.wait(2)
+    order = []
+    jobs = [q.submit(name, order.append, name, lane=lane)[0]
+            for name, lane in (("b1", "bulk"), ("b2", "bulk"), ("i1", "interactive"))]
+    release.set()
+    for job in jobs:
+        assert job.done.wait(2)
+    assert order == ["i1", "b1", "b2"]
+
+def test_reserved_worker_serves_top_lane_while_others_block():
+    release = threading.Event()
+    q = JobQueue(workers=2, maxsize=10, lanes=("interactive", "bulk"), reserved=1)
+    for _ in range(3):
+        q.submit("block", release.wait, 2, lane="bulk")
+    job, _ = q.submit("urgent", lambda: "done", lane="interactive")
+    assert job.done.wait(1)
+    assert job.result == "done"
+    release.set()
+
+def test_reserved_workers_must_leave_one_for_lower_lanes():
+    with pytest.raises(ValueError):
+        JobQueue(workers=1, lanes=("interactive", "bulk"), reserved=1)
+
+def test_retry_after_5xx_runs_again_but_4xx_replays():
+    calls = []
+    def flaky(status):
+        calls.append(status)
+        if len(calls) == 1:
+            raise JobError("unavailable", status)
+        return "ok"
+    q = JobQueue(workers=1, maxsize=10)
+    failed, _ = q.submit("op", flaky, 503, idempotency_key="k503")
+    assert failed.done.wait(2) and failed.status_code == 503
+    retry, created = q.submit("op", flaky, 503, idempotency_key="k503")
+    assert created and retry is not failed
+    assert retry.done.wait(2) and retry.result == "ok"
+
+    def missing():
+        raise JobError("not found", 404)
+    gone, _ = q.submit("op", missing, idempotency_key="k404")
+    assert gone.done.wait(2)
+    replay, created = q.submit("op", missing, idempotency_key="k404")
+    assert not created and replay is gone
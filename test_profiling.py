@@ -0,0 +1,89 @@
+import cProfile
+import logging
+import marshal
+import time
+from flask import Flask, jsonify
+from profiling import RequestProfiler, StackSampler, COLLAPSED
+
+TOKEN = "s3cret"
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+
+    @app.route("/work")
+    def work():
+        total = sum(i * i for i in range(20000))
+        return jsonify(total=total), 200
+
+    profiler = RequestProfiler()
+    profiler.init_app(app)
+    return app, profiler
+
+def test_disabled_profiler_installs_no_hooks():
+    app, profiler = make_app()
+    assert not app.before_request_funcs
+    assert not app.after_request_funcs
+    resp = app.test_client().get("/work", headers={"X-Profile-Token": TOKEN})
+    assert "X-Profile-Id" not in resp.headers
+    assert app.test_client().get("/admin/profiles").status_code == 404
+
+def test_token_header_captures_pstats_profile():
+    app, profiler = make_app(PROFILE_TOKEN=TOKEN)
+    client = app.test_client()
+    assert "X-Profile-Id" not in client.get("/work").headers
+
+    resp = client.get("/work", headers={"X-Profile-Token": TOKEN})
+    profile_id = resp.headers["X-Profile-Id"]
+    download = client.get(f"/admin/profiles/{profile_id}", headers={"X-Profile-Token": TOKEN})
+    assert download.status_code == 200
+    stats = marshal.loads(download.data)
+    assert any(func == "work" for (_, _, func) in stats)
+
+def test_profile_that_cannot_start_is_skipped(monkeypatch):
+    class BusyProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+    app, profiler = make_app(PROFILE_TOKEN=TOKEN)
+    client = app.test_client()
+    monkeypatch.setattr(cProfile, "Profile", BusyProfile)
+    resp = client.get("/work", headers={"X-Profile-Token": TOKEN})
+    assert resp.status_code == 200
+    assert "X-Profile-Id" not in resp.headers
+    # the lock was released, so the next request can still be profiled
+    monkeypatch.undo()
+    assert "X-Profile-Id" in client.get("/work", headers={"X-Profile-Token": TOKEN}).headers
+
+def test_wrong_token_is_not_profiled_and_admin_rejects():
+    app, profiler = make_app(PROFILE_TOKEN=TOKEN)
+    client = app.test_client()
+    assert "X-Profile-Id" not in client.get("/work", headers={"X-Profile-Token": "nope"}).headers
+    assert client.get("/admin/profiles", headers={"X-Profile-Token": "nope"}).status_code == 401
+
+def test_sample_rate_profiles_collapsed_stacks():
+    app, profiler = make_app(PROFILE_SAMPLE_RATE=1, PROFILE_FORMAT=COLLAPSED)
+    resp = app.test_client().get("/work")
+    assert "X-Profile-Id" in resp.headers
+    profile, data = profiler.find("latest")
+    assert profile["format"] == COLLAPSED
+    assert profile["path"] == "/work"
+
+def test_sampling_without_token_warns(caplog):
+    with caplog.at_level(logging.WARNING, logger="profiling"):
+        make_app(PROFILE_SAMPLE_RATE=0.5)
+    assert "without PROFILE_TOKEN" in caplog.text
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="profiling"):
+        make_app(PROFILE_SAMPLE_RATE=0.5, PROFILE_TOKEN=TOKEN)
+    assert "without PROFILE_TOKEN" not in caplog.text
+
+def test_stack_sampler_aggregates_hot_frames():
+    def spin(deadline):
+        while time.time() < deadline:
+            pass
+    sampler = StackSampler(interval=0.001).start()
+    spin(time.time() + 0.1)
+    sampler.stop()
+    hot = sampler.hot_frames()
+    assert hot["samples"] > 0
+    assert "test_profiling.py:spin" in sampler.collapsed()
@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+import pytest
+from scheduler import (
+    RequestScheduler,
+    WaitHistogram,
+    QueueFull,
+    DeadlineExceeded,
+    _FairQueue,
+    INTERACTIVE,
+    BULK,
+)
+
+def test_fair_queue_weights_and_late_arrival():
+    q = _FairQueue()
+    for i in range(6):
+        q.push("bulk", f"b{i}")
+    weights = {"bulk": 1, "interactive": 8}
+    # bulk alone gets served in FIFO order
+    assert q.pop(weights.get) == "b0"
+    assert q.pop(weights.get) == "b1"
+    # an interactive key arriving late is not stuck behind the bulk backlog
+    for i in range(8):
+        q.push("interactive", f"i{i}")
+    order = [q.pop(weights.get) for _ in range(9)]
+    assert order[0] == "i0"
+    assert order.count("b2") == 1
+    assert sum(1 for x in order if x.startswith("i")) == 8
+
+def test_fair_queue_round_robins_tenants():
+    q = _FairQueue()
+    for i in range(3):
+        q.push("tenant-a", f"a{i}")
+    q.push("tenant-b", "b0")
+    order = [q.pop(lambda k: 1) for _ in range(4)]
+    assert order == ["a0", "b0", "a1", "a2"]
+
+def test_histogram_percentiles():
+    h = WaitHistogram(buckets=(0.1, 1, float("inf")))
+    for _ in range(98):
+        h.observe(0.05)
+    h.observe(0.5)
+    h.observe(5)
+    assert h.percentile(50) == 0.1
+    assert h.percentile(99) == 1
+    snap = h.snapshot()
+    assert snap["count"] == 100
+    assert snap["buckets"]["+Inf"] == 100
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+def wait_until(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+def release(s, clock, seconds):
+    """Advance the fake clock and let the scheduler hand out the new tokens."""
+    clock.advance(seconds)
+    with s._cond:
+        s._dispatch(clock())
+
+def start_waiter(s, priority, tenant, outcomes):
+    def run():
+        try:
+            outcomes.append((priority, s.acquire(priority, tenant)))
+        except Exception as e:
+            outcomes.append((priority, e))
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+def test_fair_queue_forgets_idle_keys():
+    q = _FairQueue()
+    for i in range(100):
+        q.push(f"tenant-{i}", i)
+    while q.pop(lambda k: 1) is not None:
+        pass
+    assert q._start == {}
+    # keys that drain while others are still backlogged are dropped once vtime passes them
+    q.push("busy", "x1")
+    q.push("busy", "x2")
+    q.push("busy", "x3")
+    q.push("once", "o1")
+    assert [q.pop(lambda k: 1) for _ in range(3)] == ["x1", "o1", "x2"]
+    assert "once" not in q._start
+
+def test_snapshot_is_strict_json_when_waits_overflow():
+    h = WaitHistogram()
+    h.observe(700)
+    assert h.snapshot()["p99"] == 1200
+    h.observe(4000)
+    h.observe(4000)
+    snap = h.snapshot()
+    assert snap["p99"] == "+Inf"
+    assert snap["buckets"]["1800"] == 1
+    json.loads(json.dumps(snap, allow_nan=False))
+
+def test_acquire_within_budget_does_not_wait():
+    clock = FakeClock()
+    s = RequestScheduler(rate=5, period=60, clock=clock)
+    with s.context(INTERACTIVE, "t1"):
+        for _ in range(5):
+            assert s.acquire() == 0
+    assert s.stats()[INTERACTIVE]["wait_seconds"]["count"] == 5
+
+def test_deadline_exceeded_when_budget_spent(monkeypatch):
+    clock = FakeClock()
+    s = RequestScheduler(rate=1, period=60, clock=clock,
+                         classes={BULK: {"weight": 1, "max_queue": 5, "deadline": 30}})
+    # waiting on the condition just moves the fake clock forward
+    monkeypatch.setattr(s._cond, "wait", lambda timeout=None: clock.advance(timeout))
+    s.acquire(BULK, "t1")
+    with pytest.raises(DeadlineExceeded):
+        s.acquire(BULK, "t1")
+    assert clock.now == 30
+    stats = s.stats()[BULK]
+    assert stats["rejected"]["deadline"] == 1
+    assert stats["queued"] == 0
+
+def test_queue_full_rejects_immediately():
+    clock = FakeClock()
+    s = RequestScheduler(rate=1, period=60, clock=clock,
+                         classes={BULK: {"weight": 1, "max_queue": 1, "deadline": 600}})
+    s.acquire(BULK, "t1")
+    outcomes = []
+    waiter = start_waiter(s, BULK, "t1", outcomes)
+    wait_until(lambda: s.stats()[BULK]["queued"] == 1)
+    with pytest.raises(QueueFull):
+        s.acquire(BULK, "t2")
+    release(s, clock, 60)
+    waiter.join(2)
+    assert outcomes == [(BULK, 60)]
+
+def test_interactive_overtakes_bulk_backlog():
+    clock = FakeClock()
+    # one slot per hour, so nothing is granted until the test advances the clock
+    patient = {"max_queue": 10, "deadline": 10 ** 6}
+    s = RequestScheduler(rate=1, period=3600, clock=clock, classes={
+        INTERACTIVE: {"weight": 8, **patient},
+        BULK:        {"weight": 1, **patient},
+    })
+    s.acquire(BULK, "backfill")
+    outcomes = []
+    threads = [start_waiter(s, BULK, "backfill", outcomes) for _ in range(6)]
+    wait_until(lambda: s.stats()[BULK]["queued"] == 6)
+    threads.append(start_waiter(s, INTERACTIVE, "user", outcomes))
+    wait_until(lambda: s.stats()[INTERACTIVE]["queued"] == 1)
+
+    release(s, clock, 3600)
+    wait_until(lambda: len(outcomes) == 1)
+    assert outcomes[0] == (INTERACTIVE, 3600)
+    assert s.stats()[BULK]["queued"] == 6
+
+    for granted in range(2, 8):
+        release(s, clock, 3600)
+        wait_until(lambda: len(outcomes) == granted)
+    for t in threads:
+        t.join(2)
+    assert all(isinstance(waited, float) for _, waited in outcomes)
+
+def test_no_window_grants_more_than_rate(monkeypatch):
+    clock = FakeClock()
+    s = RequestScheduler(rate=10, period=60, clock=clock,
+                         classes={BULK: {"weight": 1, "max_queue": 50, "deadline": 10 ** 6}})
+    monkeypatch.setattr(s._cond, "wait", lambda timeout=None: clock.advance(timeout))
+    grants = []
+    for _ in range(25):
+        s.acquire(BULK, "backfill")
+        grants.append(clock.now)
+    # flask-limiter's moving window: at most `rate` hits in any 60s span
+    for start in grants:
+        assert sum(1 for g in grants if start <= g < start + 60) <= 10
+    assert grants[10] == 60
@@ -0,0 +1,124 @@
+import time
+import pytest
+import acme
+import acme_client
+from acme_client import AcmeClient
+from app import app as flask_app
+from tracing import (
+    Tracer,
+    InMemoryExporter,
+    BatchSpanProcessor,
+    parse_traceparent,
+    tracer,
+)
+
+BASE_URL = "http://testserver"
+TRACE_ID, PARENT_ID = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+TRACEPARENT = f"00-{TRACE_ID}-{PARENT_ID}-01"
+
+@pytest.fixture(autouse=True)
+def clear_spans():
+    tracer.processor.flush()
+    tracer.exporter.clear()
+
+def exported(trace_id):
+    tracer.processor.flush()
+    return {s["name"]: s for s in tracer.exporter.spans(trace_id)}
+
+def test_parse_traceparent():
+    assert parse_traceparent(TRACEPARENT) == (TRACE_ID, PARENT_ID)
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+def test_spans_nest_and_inject_traceparent():
+    t = Tracer(InMemoryExporter())
+    with t.span("outer", parent=TRACEPARENT) as outer:
+        with t.span("inner") as inner:
+            headers = t.inject({})
+    assert outer.trace_id == inner.trace_id == TRACE_ID
+    assert outer.parent_id == PARENT_ID
+    assert inner.parent_id == outer.span_id
+    assert headers["traceparent"] == inner.traceparent
+    t.processor.flush()
+    assert [s["name"] for s in t.exporter.spans()] == ["inner", "outer"]
+
+def test_batch_processor_drops_instead_of_blocking():
+    class StuckExporter:
+        def export(self, spans):
+            time.sleep(0.2)
+    t = Tracer()
+    t.processor = BatchSpanProcessor(StuckExporter(), max_queue=2, batch_size=1, interval=0.01)
+    start = time.perf_counter()
+    for _ in range(20):
+        with t.span("s"):
+            pass
+    assert time.perf_counter() - start < 0.1
+    assert t.processor.dropped > 0
+
+def test_request_span_continues_incoming_trace():
+    flask_app.config["TESTING"] = True
+    with flask_app.test_client() as client:
+        resp = client.get("/api/jobs/missing", headers={"traceparent": TRACEPARENT})
+    assert resp.headers["X-Trace-Id"] == TRACE_ID
+    span = exported(TRACE_ID)["GET /api/jobs/<job_id>"]
+    assert span["parentId"] == PARENT_ID
+    assert span["attributes"]["http.status_code"] == 404
+
+def test_client_records_attempts_and_retry_sleeps(requests_mock, monkeypatch):
+    slept = []
+    monkeypatch.setattr(acme_client, "_sleep", slept.append)
+    requests_mock.post(f"{BASE_URL}/token", json={"access_token": "tok", "expires_in": 3600})
+    adapter = requests_mock.post(f"{BASE_URL}/v1/acme/contacts", [
+        {"status_code": 429},
+        {"json": {"id": "xyz"}, "status_code": 201},
+    ])
+    client = AcmeClient(base_url=BASE_URL, client_id="foo", client_secret="bar")
+    with tracer.span("test", parent=TRACEPARENT):
+        client.create_contact({"acme_first_name": "X"})
+
+    tracer.processor.flush()
+    spans = tracer.exporter.spans(TRACE_ID)
+    names = [s["name"] for s in spans]
+    assert names.count("acme.attempt") == 2
+    assert "acme.retry_sleep" in names
+    assert slept == [AcmeClient.BASE_DELAY]
+    assert "acme.token_refresh" in names
+    call = next(s for s in spans if s["name"] == "acme.create_contact")
+    assert call["attributes"]["attempts"] == 2
+    failed = next(s for s in spans if s["name"] == "acme.attempt" and s["attributes"]["attempt"] == 1)
+    assert failed["attributes"]["http.status_code"] == 429
+    # the outgoing request carries the attempt span as its parent
+    sent = parse_traceparent(adapter.last_request.headers["traceparent"])
+    assert sent[0] == TRACE_ID
+
+def test_webhook_queue_wait_and_processing_spans():
+    flask_app.config["TESTING"] = True
+    with flask_app.test_client() as client:
+        resp = client.post(
+            "/webhooks/acme",
+            json={"event": "contact.created", "payload": {"id": "1"}},
+            headers={"traceparent": TRACEPARENT},
+        )
+    assert resp.status_code == 200
+    acme.WEBHOOK_QUEUE.join()
+    spans = exported(TRACE_ID)
+    received = spans["POST /webhooks/acme"]
+    assert spans["webhook.queue_wait"]["parentId"] == received["spanId"]
+    assert spans["webhook.process"]["parentId"] == received["spanId"]
+    assert "queue_wait_ms" in spans["webhook.process"]["attributes"]
+
+def test_webhook_body_traceparent_parents_request_span():
+    flask_app.config["TESTING"] = True
+    with flask_app.test_client() as client:
+        resp = client.post(
+            "/webhooks/acme",
+            json={"event": "contact.updated", "payload": {"id": "1"}, "traceparent": TRACEPARENT},
+        )
+    assert resp.headers["X-Trace-Id"] == TRACE_ID
+    acme.WEBHOOK_QUEUE.join()
+    spans = exported(TRACE_ID)
+    received = spans["POST /webhooks/acme"]
+    assert received["parentId"] == PARENT_ID
+    assert spans["webhook.queue_wait"]["parentId"] == received["spanId"]
+    assert spans["webhook.process"]["parentId"] == received["spanId"]
@@ -0,0 +1,260 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Thread
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+# W3C trace context: version-traceid-spanid-flags
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value):
+    """Return (trace_id, span_id) from a traceparent string, or None if invalid."""
+    match = TRACEPARENT_RE.match((value or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+
+def traceparent_from_body(view):
+    """Mark a view whose JSON body carries a traceparent to fall back on when the header is missing."""
+    view.traceparent_from_body = True
+    return view
+
+
+class Span:
+    def __init__(self, processor, name, trace_id, parent_id=None, start_time=None, attributes=None):
+        self._processor = processor
+        self.name       = name
+        self.trace_id   = trace_id
+        self.span_id    = os.urandom(8).hex()
+        self.parent_id  = parent_id
+        self.start_time = start_time if start_time is not None else time.time()
+        self.end_time   = None
+        self.attributes = dict(attributes or {})
+        self.status     = "ok"
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc):
+        self.status = "error"
+        self.attributes["error"] = f"{type(exc).__name__}: {exc}"
+
+    def end(self, end_time=None):
+        if self.end_time is None:
+            self.end_time = end_time if end_time is not None else time.time()
+            self._processor.on_end(self)
+
+    def to_dict(self):
+        return {
+            "name":        self.name,
+            "traceId":     self.trace_id,
+            "spanId":      self.span_id,
+            "parentId":    self.parent_id,
+            "start":       self.start_time,
+            "end":         self.end_time,
+            "durationMs":  round((self.end_time - self.start_time) * 1000, 3),
+            "status":      self.status,
+            "attributes":  self.attributes,
+        }
+
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans in memory (tests and debugging)."""
+
+    def __init__(self, max_spans=10000):
+        self._spans = deque(maxlen=max_spans)
+        self._lock  = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self._spans.extend(spans)
+
+    def spans(self, trace_id=None):
+        with self._lock:
+            return [s for s in self._spans if trace_id is None or s["traceId"] == trace_id]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class FileExporter:
+    """Appends finished spans to a file as JSON lines."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        with open(self.path, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+
+
+class BatchSpanProcessor:
+    """Hands finished spans to an exporter from a background thread.
+
+    on_end never blocks the traced code: spans go on a bounded queue and are
+    dropped (and counted) if the exporter falls behind.
+    """
+
+    def __init__(self, exporter, max_queue=2048, batch_size=256, interval=1.0):
+        self.exporter   = exporter
+        self.batch_size = batch_size
+        self.interval   = interval
+        self.dropped    = 0
+        self._queue     = queue.Queue(maxsize=max_queue)
+        self._thread    = None
+        self._lock      = threading.Lock()
+
+    def on_end(self, span):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5):
+        """Block until every span queued so far has been exported."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch, deadline = [], time.monotonic() + self.interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            flush = isinstance(item, threading.Event)
+            if item is not None and not flush:
+                batch.append(item)
+            if batch and (flush or item is None or len(batch) >= self.batch_size):
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.error(f"Error exporting {len(batch)} spans: {e}")
+                batch = []
+            if flush:
+                item.set()
+            if item is None or not batch:
+                deadline = time.monotonic() + self.interval
+
+
+class Tracer:
+    """Creates spans, tracks the active one and propagates W3C traceparent."""
+
+    def __init__(self, exporter=None):
+        self.configure(exporter or InMemoryExporter())
+
+    def configure(self, exporter, **processor_options):
+        self.exporter  = exporter
+        self.processor = BatchSpanProcessor(exporter, **processor_options)
+
+    def current_span(self):
+        return _current_span.get()
+
+    def traceparent(self):
+        span = _current_span.get()
+        return span.traceparent if span is not None else None
+
+    def inject(self, headers):
+        """Add the active span's traceparent to an outgoing headers dict."""
+        span = _current_span.get()
+        if span is not None:
+            headers["traceparent"] = span.traceparent
+        return headers
+
+    def start_span(self, name, parent=None, start_time=None, **attributes):
+        """Start a span without activating it. parent is a Span, a traceparent string or None (active span)."""
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, Span):
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = parse_traceparent(parent) or (os.urandom(16).hex(), None)
+        return Span(self.processor, name, trace_id, parent_id, start_time, attributes)
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        """Run the block inside a new active span, recording any exception on it."""
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def init_app(self, app):
+        """Open a server span per request, continuing any incoming traceparent."""
+        path = app.config.get("TRACE_FILE")
+        if path:
+            self.configure(FileExporter(path))
+
+        @app.before_request
+        def start_request_span():
+            rule = request.url_rule.rule if request.url_rule else request.path
+            parent = request.headers.get("traceparent")
+            if parent is None and getattr(app.view_functions.get(request.endpoint), "traceparent_from_body", False):
+                body = request.get_json(silent=True)
+                parent = body.get("traceparent") if isinstance(body, dict) else None
+            span = self.start_span(
+                f"{request.method} {rule}",
+                # an empty parent starts a new trace rather than nesting under the active span
+                parent=parent or "",
+                **{"http.method": request.method, "http.path": request.path},
+            )
+            request.environ["tracing.span"] = (span, _current_span.set(span))
+
+        @app.after_request
+        def tag_response(response):
+            active = request.environ.get("tracing.span")
+            if active:
+                active[0].set_attribute("http.status_code", response.status_code)
+                response.headers["X-Trace-Id"] = active[0].trace_id
+            return response
+
+        @app.teardown_request
+        def end_request_span(exc):
+            active = request.environ.pop("tracing.span", None)
+            if active:
+                span, token = active
+                if exc is not None:
+                    span.record_error(exc)
+                _current_span.reset(token)
+                span.end()
+
+        app.extensions["tracer"] = self
+
+
+tracer = Tracer()